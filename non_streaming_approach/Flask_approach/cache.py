@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import re
+import string
+
+import numpy as np
+import redis
+from redis.commands.search.field import TagField, TextField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from sentence_transformers import SentenceTransformer
+
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Cosine similarity a stored question needs to reach before its answer is reused
+SIMILARITY_THRESHOLD = 0.9
+CACHE_TTL_SECONDS = 4 * 60 * 60
+
+INDEX_NAME = "ivr_llm_cache"
+KEY_PREFIX = "llm_cache:"
+EXACT_PREFIX = "exact:"
+
+# Lookup outcomes, reported back to Twilio in the X-Cache header
+HIT_EXACT = "HIT-EXACT"
+HIT_SEMANTIC = "HIT-SEMANTIC"
+MISS = "MISS"
+
+_PUNCT_STRIP = str.maketrans("", "", string.punctuation)
+
+
+# "What are your hours?" and "what are your  hours" normalize to the same text
+def normalize(text):
+    return re.sub(r"\s+", " ", text.strip().lower().translate(_PUNCT_STRIP)).strip()
+
+
+def _words(text):
+    return set(normalize(text).split())
+
+
+def is_context_free(conversation_history):
+    """True when the history is just the caller's opening question."""
+    return len(conversation_history) == 1 and conversation_history[0]["role"] == "user"
+
+
+class SemanticCache:
+    """Caches LLM answers in Redis, keyed by the caller's question.
+
+    Lookups first try a plain GET on the SHA256 of the normalized question,
+    then fall back to a KNN vector search so paraphrased questions
+    ("when are you open?" / "what are your hours?") reuse the same answer.
+
+    Only context-free turns are cached. Normalized follow-ups such as "yes"
+    would otherwise match across every call and return another caller's reply.
+
+    Entries live under ``namespace`` (the system prompt version), so editing
+    the prompt stops old answers from being served right away.
+
+    An answer is only stored when it can be derived from ``reference_text``
+    (the system prompt) alone: if it repeats any word the caller said that the
+    prompt doesn't contain, such as a name or a date, it stays uncached so it
+    can't be served to a different caller.
+    """
+
+    def __init__(self, namespace, reference_text, redis_url=REDIS_URL, model_name=EMBEDDING_MODEL,
+                 threshold=SIMILARITY_THRESHOLD, ttl=CACHE_TTL_SECONDS, logger=None):
+        self.namespace = namespace
+        self.reference_words = _words(reference_text)
+        self.logger = logger or logging.getLogger(__name__)
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        # Fail fast when Redis is down, before paying for loading the embedding model
+        self.redis.ping()
+        self.model = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.ttl = ttl
+        self._ensure_index()
+
+    def _ensure_index(self):
+        try:
+            self.redis.ft(INDEX_NAME).info()
+        except redis.ResponseError:
+            schema = (
+                TagField("namespace"),
+                TextField("query"),
+                TextField("response"),
+                VectorField("embedding", "HNSW", {
+                    "TYPE": "FLOAT32",
+                    "DIM": self.model.get_sentence_embedding_dimension(),
+                    "DISTANCE_METRIC": "COSINE",
+                }),
+            )
+            definition = IndexDefinition(prefix=[KEY_PREFIX], index_type=IndexType.HASH)
+            self.redis.ft(INDEX_NAME).create_index(schema, definition=definition)
+
+    def _key(self, normalized):
+        return f"{self.namespace}:" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _embed(self, normalized):
+        embedding = self.model.encode(normalized, normalize_embeddings=True)
+        return np.asarray(embedding, dtype=np.float32).tobytes()
+
+    def lookup(self, conversation_history):
+        """Return ``(response, status)``, where status is HIT_EXACT, HIT_SEMANTIC or MISS."""
+        if not is_context_free(conversation_history):
+            return None, MISS
+
+        normalized = normalize(conversation_history[0]["content"])
+        if not normalized:
+            return None, MISS
+
+        try:
+            # Exact-match fast path, no embedding needed
+            response = self.redis.get(EXACT_PREFIX + self._key(normalized))
+            if response is not None:
+                return response, HIT_EXACT
+
+            query = (
+                Query(f"(@namespace:{{{self.namespace}}})=>[KNN 1 @embedding $vec AS distance]")
+                .sort_by("distance")
+                .return_fields("response", "distance")
+                .dialect(2)
+            )
+            result = self.redis.ft(INDEX_NAME).search(
+                query, query_params={"vec": self._embed(normalized)}
+            )
+
+            if result.docs:
+                doc = result.docs[0]
+                # Redis reports cosine distance, i.e. 1 - similarity
+                if 1 - float(doc.distance) >= self.threshold:
+                    return doc.response, HIT_SEMANTIC
+
+        # Any cache fault (Redis or the embedding model) is treated as a miss
+        except Exception as e:
+            self.logger.warning(f"Cache lookup failed, falling through to the LLM: {e}")
+
+        return None, MISS
+
+    def _is_shareable(self, question, response):
+        caller_words = _words(question) - self.reference_words
+        return not (caller_words & _words(response))
+
+    def put(self, conversation_history, response):
+        if not is_context_free(conversation_history):
+            return
+
+        question = conversation_history[0]["content"]
+        normalized = normalize(question)
+        if not normalized or not self._is_shareable(question, response):
+            return
+
+        suffix = self._key(normalized)
+        key = KEY_PREFIX + suffix
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(EXACT_PREFIX + suffix, response, ex=self.ttl)
+            pipe.hset(key, mapping={
+                "namespace": self.namespace,
+                "query": normalized,
+                "response": response,
+                "embedding": self._embed(normalized),
+            })
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Cache write failed: {e}")
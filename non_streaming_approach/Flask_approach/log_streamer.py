@@ -1,10 +1,31 @@
+# Patch blocking I/O first so every SSE client is a greenlet rather than an OS thread
+from gevent import monkey
+monkey.patch_all()
+
+import gevent
+from gevent.event import Event
+from gevent.pywsgi import WSGIServer
 from flask import Flask, Response, render_template_string
-import time
 import os
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
 
 app = Flask(__name__)
 LOG_FILE_PATH = "logs/conversation.log"
 
+# Set (and replaced with a fresh Event) every time the log is written. One inotify watcher
+# is shared by all SSE clients, so viewers don't each use up an inotify instance.
+# Stays None where inotify is unavailable (macOS, Windows) and clients fall back to polling.
+_log_written = None
+_log_watcher_started = False
+
+# Backstop so a viewer re-checks the file even if a wake-up is ever missed
+LOG_WAIT_TIMEOUT = 5
+
 HTML_TEMPLATE = """
 <!doctype html>
 <html>
@@ -47,21 +68,119 @@ HTML_TEMPLATE = """
 def index():
     return render_template_string(HTML_TEMPLATE)
 
+def watch_log(inotify):
+    global _log_written
+
+    try:
+        while True:
+            events = inotify.read()
+            written, _log_written = _log_written, Event()
+            written.set()
+
+            # The logs/ directory itself was removed, there is nothing left to watch
+            if any(event.mask & flags.IGNORED for event in events):
+                print("Log directory watch was dropped, log viewers will poll instead")
+                break
+    except Exception as e:
+        print("Log watcher stopped, log viewers will poll instead:", str(e))
+    finally:
+        # Wake everyone one last time and switch them to polling
+        written, _log_written = _log_written, None
+        if written is not None:
+            written.set()
+        inotify.close()
+
+
+def start_log_watcher():
+    global _log_written, _log_watcher_started
+
+    if _log_watcher_started:
+        return
+    _log_watcher_started = True
+
+    if INotify is None:
+        return
+
+    # Watch the directory rather than the file: RotatingFileHandler renames the log at 10 MB
+    # and a file watch would stay on the old inode, while the directory sees the new file too
+    try:
+        inotify = INotify()
+        inotify.add_watch(
+            os.path.dirname(LOG_FILE_PATH),
+            flags.MODIFY | flags.CREATE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+        )
+    except (OSError, AttributeError) as e:
+        print("inotify unavailable, log viewers will poll instead:", str(e))
+        return
+
+    _log_written = Event()
+    gevent.spawn(watch_log, inotify)
+
+
 @app.route("/stream")
 def stream():
     def generate():
+        os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
         if not os.path.exists(LOG_FILE_PATH):
             open(LOG_FILE_PATH, "a").close()
 
-        with open(LOG_FILE_PATH, "r") as f:
-            f.seek(0, os.SEEK_END)
+        start_log_watcher()
+
+        f = open(LOG_FILE_PATH, "rb")
+        try:
+            last_size = f.seek(0, os.SEEK_END)
+            partial = b""
             while True:
-                line = f.readline()
-                if not line:
-                    time.sleep(0.5)
+                # Grab the event before reading, so a write during the read still wakes us
+                log_written = _log_written
+
+                new_size = os.fstat(f.fileno()).st_size
+
+                # `/call_status` truncates the log when a call ends, start over from the top
+                if new_size < last_size:
+                    f.seek(0)
+                    last_size = 0
+                    partial = b""
+
+                if new_size > last_size:
+                    # Read the whole burst in one go, holding back any unfinished last line
+                    chunk = partial + f.read(new_size - last_size)
+                    last_size = new_size
+
+                    lines = chunk.split(b"\n")
+                    partial = lines.pop()
+                    for line in lines:
+                        yield f"data: {line.decode('utf-8', errors='replace').strip()}\n\n"
+
+                # The log was rotated or recreated, follow the new file from its start
+                try:
+                    rotated = os.stat(LOG_FILE_PATH).st_ino != os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    rotated = False
+
+                if rotated:
+                    # Flush whatever reached the old file before it was closed for rotation
+                    for line in (partial + f.read()).splitlines():
+                        yield f"data: {line.decode('utf-8', errors='replace').strip()}\n\n"
+
+                    f.close()
+                    f = open(LOG_FILE_PATH, "rb")
+                    last_size = 0
+                    partial = b""
                     continue
-                yield f"data: {line.strip()}\n\n"
-    return Response(generate(), mimetype="text/event-stream")
+
+                # Sleep until the shared watcher sees a write, or poll where inotify is missing
+                if log_written is not None:
+                    log_written.wait(timeout=LOG_WAIT_TIMEOUT)
+                else:
+                    time.sleep(0.5)
+        finally:
+            f.close()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    # Stop reverse proxies (nginx) from buffering the event stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 if __name__ == "__main__":
-    app.run(debug=False, port=5050, threaded=True)
+    WSGIServer(('127.0.0.1', 5050), app).serve_forever()
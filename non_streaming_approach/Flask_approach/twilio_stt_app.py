@@ -1,10 +1,20 @@
-from flask import Flask, request, Response
+from quart import Quart, request, Response
 from twilio.twiml.voice_response import VoiceResponse, Gather
-import requests
-import threading
+import httpx
+import orjson
+import asyncio
+import hashlib
 import os
+import re
+import time
+from xml.sax.saxutils import escape
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from threading import RLock
+from cachetools import TTLCache
+from cache import SemanticCache, is_context_free, normalize, MISS
 
 
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
@@ -18,7 +28,38 @@ if not MISTRAL_API_KEY:
     print("Error: Mistral API Key is required to run this program.")
     exit(1)
 
-app = Flask(__name__)
+app = Quart(__name__)
+
+# Shared async HTTP client so every LLM call reuses a pooled keep-alive TLS connection
+# and waiting on Mistral never pins a worker
+_HTTP = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+
+# Resolve DNS and finish the TCP + TLS handshake with Mistral once per worker at startup,
+# so the first caller doesn't pay for it. The warm connection stays in the keep-alive pool.
+@app.before_serving
+async def prewarm_http():
+    started = time.perf_counter()
+    try:
+        await _HTTP.head(
+            "https://api.mistral.ai/v1/models",
+            headers={"Authorization": f"Bearer {MISTRAL_API_KEY}"}
+        )
+    except httpx.HTTPError as e:
+        print("Could not pre-warm the Mistral connection:", str(e))
+        app.logger.warning(f"Could not pre-warm the Mistral connection: {e}")
+        return
+
+    app.logger.info(f"Mistral connection warmed up in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+@app.after_serving
+async def close_http():
+    await _HTTP.aclose()
 
 # --- Set up Logging (Moved OUTSIDE __main__) ---
 if not os.path.exists('logs'):
@@ -41,21 +82,49 @@ console_handler = logging.StreamHandler()
 console_handler.setFormatter(log_formatter)
 console_handler.setLevel(logging.DEBUG)
 
-app.logger.addHandler(file_handler)
-app.logger.addHandler(console_handler)
+# Requests only enqueue log records; a listener thread does the actual disk and console writes
+log_queue = queue.Queue(-1)
+app.logger.addHandler(QueueHandler(log_queue))
+
+log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 app.logger.setLevel(logging.DEBUG)
 
 
 
 
-# Store conversation history per call
-conversation_history = {}
+# Store conversation history per call. Entries expire after 30 minutes without a new
+# turn, so calls that never send a `completed` status don't leak.
+conversation_history = TTLCache(maxsize=10_000, ttl=30 * 60)
 
+# conversation_history is only touched from the event loop thread today, so this lock guards
+# nothing yet. It is kept so read-modify-writes stay safe if any of them move to a thread pool.
+_lock = RLock()
 
-@app.route("/call", methods=["POST"])
-def call():
+# Only the most recent messages are resent to the LLM, older ones are folded into a summary
+MAX_HISTORY_MESSAGES = 8
+
+# Keeps fire-and-forget tasks referenced until they finish
+background_tasks = set()
+
+# Calls with a summary request in flight. Trimming waits for it, so two summaries never race
+# and overwrite each other.
+summarizing_calls = set()
 
+# LLM replies still being generated, awaited by `/speak_response`. Like the history, entries
+# expire on their own so a hang-up without a `completed` status doesn't leak the task.
+pending_replies = TTLCache(maxsize=10_000, ttl=5 * 60)
+
+# A sentence is complete once its closing punctuation is followed by whitespace
+SENTENCE_END = re.compile(r"[.!?]\s")
+
+
+# --- TwiML documents ---
+# These barely change between requests, so they are serialized once at import. Dynamic
+# text is dropped into a "{}" placeholder with SPEAK_TEMPLATE.format(escape(text)).
+def _build_welcome_response():
     response = VoiceResponse()
     
     response.say("Welcome to the automated assistant. What can I help you with today?", voice='Polly.Stephen-Neural')
@@ -73,74 +142,46 @@ def call():
     # When the call ends, Twilio will POST to this URL
     response.hangup()
 
-    return Response(str(response), mimetype="text/xml")
-
+    return response
 
 
-# Process Speech Input, Call AI, and Redirect to `/speak_response`
-@app.route("/process_speech", methods=["POST"])
-def process_speech():
-    voice_input = request.form.get("SpeechResult", "").strip()
-    call_sid = request.form.get("CallSid", "")
-
+def _build_retry_response():
     response = VoiceResponse()
+    response.say("I couldn't understand that. Could you please repeat?", voice='Polly.Stephen-Neural')
+    response.redirect("/call")
+    return response
 
-    if not voice_input:
-        response.say("I couldn't understand that. Could you please repeat?", voice='Polly.Stephen-Neural')
-        response.redirect("/call") 
-        return Response(str(response), mimetype="text/xml")
-
-    print(f"🎤 User said: {voice_input}")
-    app.logger.info(f"🎤 User said: {voice_input}")
-    for handler in app.logger.handlers:
-        if hasattr(handler, 'flush'):
-            handler.flush()
-
-    # Initialize conversation history if it's a new call
-    if call_sid not in conversation_history:
-        conversation_history[call_sid] = []
 
-    # Add user input to history
-    conversation_history[call_sid].append({"role": "user", "content": voice_input})
-
-    # Run LLM Query in a Separate Thread
-    def process_ai():
-        ai_response = query_llm(conversation_history[call_sid])  
-
-        # For this project to work with the local LLM/MIE_LLM_function_calling example you can uncomment the below line and comment the previous ai_response declaration
-        # ai_response = query_llm(voice_input, call_sid) 
+def _build_redirect_response():
+    response = VoiceResponse()
+    response.redirect("/speak_response")
+    return response
 
-        print(f"AI Response: {ai_response}")
-        app.logger.info(f"🤖 AI Response: {ai_response}")
-        for handler in app.logger.handlers:
-            if hasattr(handler, 'flush'):
-                handler.flush()
 
-        # Add AI response to history
-        conversation_history[call_sid].append({"role": "assistant", "content": ai_response})
+# Speak the first streamed sentence, then come back to `/speak_response` for the rest
+def _build_first_sentence_response(text):
+    response = VoiceResponse()
 
-    thread = threading.Thread(target=process_ai)
-    thread.start()
-    thread.join()  # Ensure AI processing completes before moving forward
+    gather = Gather(
+        input="speech",
+        speech_timeout="auto",
+        speech_model="deepgram_nova-2",
+        enhanced=True,
+        action="/process_speech",
+        bargeIn=True,
+        timeout=1
+    )
+    gather.say(text, voice='Polly.Stephen-Neural')
 
+    response.append(gather)
     response.redirect("/speak_response")
 
-    return Response(str(response), mimetype="text/xml")
+    return response
 
 
-# Speak AI Response & Ask User for More Questions
-@app.route("/speak_response", methods=["POST"])
-def speak_response():
-    call_sid = request.form.get("CallSid", "")
-
+def _build_speak_response(text):
     response = VoiceResponse()
 
-    ai_response = (
-        conversation_history[call_sid][-1]["content"]
-        if call_sid in conversation_history and conversation_history[call_sid]
-        else "I'm sorry, I couldn't process your request."
-    )
-
     # Gather input while speaking, allowing barge-in
     gather = Gather(
         input="speech",
@@ -152,21 +193,158 @@ def speak_response():
     )
 
     # Move the AI response inside Gather to allow interruption
-    gather.say(ai_response, voice='Polly.Stephen-Neural')
+    if text:
+        gather.say(text, voice='Polly.Stephen-Neural')
 
     response.append(gather)
 
-    return Response(str(response), mimetype="text/xml")
+    return response
+
+
+WELCOME_XML = str(_build_welcome_response())
+RETRY_XML = str(_build_retry_response())
+REDIRECT_XML = str(_build_redirect_response())
+LISTEN_XML = str(_build_speak_response(None))
+FIRST_SENTENCE_TEMPLATE = str(_build_first_sentence_response("{}"))
+SPEAK_TEMPLATE = str(_build_speak_response("{}"))
+
+
+@app.route("/call", methods=["POST"])
+async def call():
+    return Response(WELCOME_XML, mimetype="text/xml")
+
+
+
+# Process Speech Input, Call AI, and Redirect to `/speak_response`
+@app.route("/process_speech", methods=["POST"])
+async def process_speech():
+    form = await request.form
+    voice_input = form.get("SpeechResult", "").strip()
+    call_sid = form.get("CallSid", "")
+
+    if not voice_input:
+        return Response(RETRY_XML, mimetype="text/xml")
+
+    print(f"🎤 User said: {voice_input}")
+    app.logger.info(f"🎤 User said: {voice_input}")
+
+    with _lock:
+        # Initialize conversation history if it's a new call
+        if call_sid not in conversation_history:
+            conversation_history[call_sid] = []
+
+        # Add user input to history
+        conversation_history[call_sid].append({"role": "user", "content": voice_input})
+        history = list(conversation_history[call_sid])
+
+    # Resolved with the first streamed sentence so `/speak_response` can start talking early
+    first_sentence = asyncio.get_running_loop().create_future()
+
+    def on_sentence(sentence):
+        if not first_sentence.done():
+            first_sentence.set_result(sentence)
+
+    reply = {
+        "first_sentence": first_sentence,
+        "spoken": "",
+        "cache_status": MISS
+    }
+
+    # Run LLM Query in the background so Twilio gets its TwiML right away
+    async def process_ai():
+        ai_response, reply["cache_status"] = await query_llm(history, on_sentence)  
+
+        # For this project to work with the local LLM/MIE_LLM_function_calling example you can uncomment the below line and comment the previous ai_response declaration
+        # ai_response, reply["cache_status"] = await query_llm(voice_input, call_sid) 
+
+        print(f"AI Response: {ai_response}")
+        app.logger.info(f"🤖 AI Response: {ai_response}")
+
+        # Add AI response to history
+        with _lock:
+            if call_sid in conversation_history:
+                conversation_history[call_sid].append({"role": "assistant", "content": ai_response})
+                trim_history(call_sid)
+
+        return ai_response
+
+    # The caller barged in over an earlier reply, drop it so it can't land after this turn
+    previous_reply = pending_replies.pop(call_sid, None)
+    if previous_reply:
+        previous_reply["task"].cancel()
+
+    reply["task"] = asyncio.create_task(process_ai())
+    pending_replies[call_sid] = reply
+
+    return Response(REDIRECT_XML, mimetype="text/xml")
+
+
+# Speak AI Response & Ask User for More Questions
+@app.route("/speak_response", methods=["POST"])
+async def speak_response():
+    form = await request.form
+    call_sid = form.get("CallSid", "")
+
+    # Wait for the reply started in `/process_speech`
+    spoken = ""
+    headers = {}
+    ai_response = None
+    reply = pending_replies.get(call_sid)
+    if reply:
+        if not reply["spoken"]:
+            await asyncio.wait(
+                {reply["task"], reply["first_sentence"]},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            # Still generating: speak the first sentence now and come back for the rest
+            if not reply["task"].done():
+                reply["spoken"] = reply["first_sentence"].result()
+                return Response(
+                    FIRST_SENTENCE_TEMPLATE.format(escape(reply["spoken"])),
+                    mimetype="text/xml",
+                    headers={"X-Cache": MISS}
+                )
+
+        spoken = reply["spoken"]
+        ai_response = await reply["task"]
+        headers["X-Cache"] = reply["cache_status"]
+
+        # Only clear the entry if a newer turn hasn't replaced it meanwhile
+        if pending_replies.get(call_sid) is reply:
+            pending_replies.pop(call_sid)
+
+    if ai_response is None:
+        with _lock:
+            history = conversation_history.get(call_sid)
+            ai_response = (
+                history[-1]["content"]
+                if history and history[-1]["role"] == "assistant"
+                else "I'm sorry, I couldn't process your request."
+            )
+
+    # Skip the sentence that was already spoken while the LLM was still streaming
+    if spoken and ai_response.strip().startswith(spoken):
+        ai_response = ai_response.strip()[len(spoken):].strip()
+
+    if not ai_response:
+        return Response(LISTEN_XML, mimetype="text/xml", headers=headers)
+
+    return Response(SPEAK_TEMPLATE.format(escape(ai_response)), mimetype="text/xml", headers=headers)
 
 
 @app.route("/call_status", methods=["POST"])
-def call_status():
-    call_sid = request.form.get("CallSid", "")
-    call_status = request.form.get("CallStatus", "")
+async def call_status():
+    form = await request.form
+    call_sid = form.get("CallSid", "")
+    call_status = form.get("CallStatus", "")
 
     if call_status == "completed":
-        if call_sid in conversation_history:
-            del conversation_history[call_sid]
+        with _lock:
+            conversation_history.pop(call_sid, None)
+
+        if call_sid in pending_replies:
+            pending_replies.pop(call_sid)["task"].cancel()
 
         with open("logs/conversation.log", "w") as f:
             f.write("")  # truncate the file
@@ -178,76 +356,225 @@ def call_status():
 
 
 
-# Function to Interact with LLM with History
-def query_llm(conversation_history):
+# System prompt sent ahead of every conversation. It is built once and kept
+# byte-identical across calls so Mistral's prompt-prefix cache can reuse it.
+SYSTEM_PROMPT = """You are an intelligent IVR assistant for a hospital. Your goal is to assist callers by providing accurate information about the hospital, including operational hours, address, and general guidance. 
+
+You should always respond in a **polite and professional tone**, ensuring clarity in communication. When a caller asks about hospital timings, provide them with the correct schedule, including open and closed hours. If they ask for the hospital's address, provide the full location in a structured manner.
+
+**Key Instructions:**
+1. If a caller asks about hospital hours, state the operating hours from **Monday to Friday** and inform them that the hospital is closed on **Saturday and Sunday**.
+2. If a caller requests the hospital's address, provide the full address in a clear format.
+3. If a caller asks about both the **timings and address**, provide both details in a well-structured response.
+4. Ensure responses are **concise, yet complete**, to avoid confusion for the caller.
+5. If the caller asks a question that you **do not have an answer for**, kindly inform them that they can reach the hospital directly for further inquiries.
+6. Finally after giving a caller a complete answer(That does not include answers where you needed a detail and investigated from the user), ask the callers if they have any more questions.
+If the caller has no more questions, end the conversation politely and ask the user to hang up the phone call.
+
+Example Responses:
+
+**For Hospital Timings Inquiry:**
+"The hospital operates from **Monday to Friday**, between **8:00 AM and 6:00 PM**. Please note that we are closed on **Saturdays and Sundays**."
+
+**For Hospital Address Inquiry:**
+"Our hospital is located at:
+**MediCare General Hospital**
+1234 Wellness Avenue,
+Springfield, IL, 62704, USA."
+
+**For Both Timings and Address Inquiry:**
+"Thank you for contacting MediCare General Hospital. Our operating hours are **Monday to Friday from 8:00 AM to 6:00 PM**. We remain **closed on Saturdays and Sundays**.  
+You can visit us at:  
+**MediCare General Hospital**  
+1234 Wellness Avenue,  
+Springfield, IL, 62704, USA.  
+If you need any further assistance, feel free to contact our front desk."
+
+Ensure that all responses are **formatted clearly**, so the caller can easily understand the details.
+"""
+
+# The system message is shared by every request instead of being rebuilt per call
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Changes whenever the prompt does, so coalesced requests never mix answers from two prompts
+SYSTEM_PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# Upstream LLM requests currently running, keyed by conversation + prompt version
+_inflight = {}
+
+# Semantic cache in front of the LLM, so repeated or paraphrased questions skip Mistral.
+# Namespaced by prompt version so answers from an older prompt are never served.
+try:
+    response_cache = SemanticCache(SYSTEM_PROMPT_VERSION, SYSTEM_PROMPT, logger=app.logger)
+except Exception as e:
+    print("Semantic cache unavailable, every question will go to the LLM:", str(e))
+    app.logger.warning(f"Semantic cache unavailable: {e}")
+    response_cache = None
+
+
+# Function to Interact with LLM with History.
+# The reply is streamed from Mistral, and `on_sentence` is called as each sentence completes.
+# Returns the reply together with its cache status (HIT-EXACT / HIT-SEMANTIC / MISS).
+async def query_llm(conversation_history, on_sentence=None):
     try:
-        system_prompt = """You are an intelligent IVR assistant for a hospital. Your goal is to assist callers by providing accurate information about the hospital, including operational hours, address, and general guidance. 
+        # Only the opening question of a call is context-free. Follow-ups ("yes", "and the address?")
+        # depend on the conversation, and replies to them may repeat what this caller told us,
+        # so they never read from or write to the shared cache.
+        user_input = conversation_history[-1]["content"]
+        cacheable = is_context_free(conversation_history)
+
+        # Answer straight from the cache if this question was asked before
+        if response_cache and cacheable:
+            cached_response, cache_status = await asyncio.to_thread(response_cache.lookup, conversation_history)
+            if cached_response is not None:
+                app.logger.info(f"Cache {cache_status} for: {user_input}")
+                return cached_response, cache_status
+
+        # Concurrent callers with the same conversation so far share a single upstream request.
+        # The whole history is keyed, so a reply is never shared across different conversations.
+        normalized_history = [(message["role"], normalize(message["content"])) for message in conversation_history]
+        key = hashlib.sha256(SYSTEM_PROMPT_VERSION.encode("utf-8") + orjson.dumps(normalized_history)).hexdigest()
+        if key in _inflight:
+            app.logger.info(f"Joining in-flight LLM request for: {user_input}")
+        else:
+            _inflight[key] = asyncio.create_task(stream_llm(conversation_history, cacheable, on_sentence))
+            _inflight[key].add_done_callback(lambda _: _inflight.pop(key, None))
+
+        # Shielded so a caller hanging up doesn't cancel the request for everyone else
+        return await asyncio.shield(_inflight[key]), MISS
+
+    except Exception as e:
+        print("Error calling LLM API:", str(e))  # Debugging output
+        app.logger.error(f"Error calling LLM API: {e}")
+        return "I'm sorry, I couldn't process your request.", MISS
+
+
+# Stream a completion from Mistral and cache the finished answer when it is context-free
+async def stream_llm(conversation_history, cacheable, on_sentence=None):
+    # Format conversation history for LLM and give it the system prompt
+    formatted_history = (_SYSTEM_MSG, *conversation_history)
+
+    # Mistral API approach 
+    headers = {
+        "Authorization": f"Bearer {MISTRAL_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": "mistral-small",  
+        "messages": formatted_history,
+        "stream": True
+    }
+
+    tokens = []
+    sentence_buffer = ""
+
+    async with _HTTP.stream("POST", "https://api.mistral.ai/v1/chat/completions", content=orjson.dumps(payload), headers=headers) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return f"Error: {orjson.loads(response.content)}"
+
+        # Server-sent events, one `data: {...}` frame per chunk of tokens
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
 
-        You should always respond in a **polite and professional tone**, ensuring clarity in communication. When a caller asks about hospital timings, provide them with the correct schedule, including open and closed hours. If they ask for the hospital's address, provide the full location in a structured manner.
+            token = orjson.loads(data)["choices"][0]["delta"].get("content") or ""
+            tokens.append(token)
+            sentence_buffer += token
 
-        **Key Instructions:**
-        1. If a caller asks about hospital hours, state the operating hours from **Monday to Friday** and inform them that the hospital is closed on **Saturday and Sunday**.
-        2. If a caller requests the hospital's address, provide the full address in a clear format.
-        3. If a caller asks about both the **timings and address**, provide both details in a well-structured response.
-        4. Ensure responses are **concise, yet complete**, to avoid confusion for the caller.
-        5. If the caller asks a question that you **do not have an answer for**, kindly inform them that they can reach the hospital directly for further inquiries.
-        6. Finally after giving a caller a complete answer(That does not include answers where you needed a detail and investigated from the user), ask the callers if they have any more questions.
-        If the caller has no more questions, end the conversation politely and ask the user to hang up the phone call.
+            match = SENTENCE_END.search(sentence_buffer)
+            while match:
+                if on_sentence:
+                    on_sentence(sentence_buffer[:match.end()].strip())
+                sentence_buffer = sentence_buffer[match.end():]
+                match = SENTENCE_END.search(sentence_buffer)
 
-        Example Responses:
+    ai_response = "".join(tokens)
 
-        **For Hospital Timings Inquiry:**
-        "The hospital operates from **Monday to Friday**, between **8:00 AM and 6:00 PM**. Please note that we are closed on **Saturdays and Sundays**."
+    # Store the answer off the critical path, the caller shouldn't wait on embedding + Redis
+    if response_cache and cacheable:
+        task = asyncio.create_task(asyncio.to_thread(response_cache.put, conversation_history, ai_response))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
 
-        **For Hospital Address Inquiry:**
-        "Our hospital is located at:
-        **MediCare General Hospital**
-        1234 Wellness Avenue,
-        Springfield, IL, 62704, USA."
+    return ai_response
 
-        **For Both Timings and Address Inquiry:**
-        "Thank you for contacting MediCare General Hospital. Our operating hours are **Monday to Friday from 8:00 AM to 6:00 PM**. We remain **closed on Saturdays and Sundays**.  
-        You can visit us at:  
-        **MediCare General Hospital**  
-        1234 Wellness Avenue,  
-        Springfield, IL, 62704, USA.  
-        If you need any further assistance, feel free to contact our front desk."
 
-        Ensure that all responses are **formatted clearly**, so the caller can easily understand the details.
-        """
+# Keep only the last MAX_HISTORY_MESSAGES messages and summarize the dropped ones in the background
+def trim_history(call_sid):
+    with _lock:
+        history = conversation_history[call_sid]
 
-        # Format conversation history for LLM and give it the system prompt
-        formatted_history = [{"role": "system", "content": system_prompt}] + conversation_history
+        summary = history[:1] if history and history[0]["role"] == "system" else []
+        turns = history[len(summary):]
+
+        # Keep everything until the pending summary lands, the next turn trims against it
+        if len(turns) <= MAX_HISTORY_MESSAGES or call_sid in summarizing_calls:
+            # Re-assigning the entry also refreshes its TTL
+            conversation_history[call_sid] = history
+            return
+
+        conversation_history[call_sid] = summary + turns[-MAX_HISTORY_MESSAGES:]
+        summarizing_calls.add(call_sid)
+
+    task = asyncio.create_task(summarize_history(call_sid, summary + turns[:-MAX_HISTORY_MESSAGES]))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    task.add_done_callback(lambda _: summarizing_calls.discard(call_sid))
+
+
+# Compress dropped messages into a single "Summary: ..." system message using a cheaper model
+async def summarize_history(call_sid, messages):
+    try:
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
 
-        # Mistral API approach 
         headers = {
             "Authorization": f"Bearer {MISTRAL_API_KEY}",
             "Content-Type": "application/json"
         }
 
         payload = {
-            "model": "mistral-small",  
-            "messages": formatted_history
+            "model": "mistral-tiny",
+            "messages": [{
+                "role": "user",
+                "content": "Summarize this phone conversation between a hospital IVR assistant and a caller "
+                           "in two or three sentences, keeping any details the caller gave:\n\n" + transcript
+            }]
         }
 
-        response = requests.post("https://api.mistral.ai/v1/chat/completions", json=payload, headers=headers)
-        
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            return f"Error: {response.json()}"
+        response = await _HTTP.post("https://api.mistral.ai/v1/chat/completions", content=orjson.dumps(payload), headers=headers)
+        if response.status_code != 200:
+            print(f"Error summarizing conversation history: {response.status_code} {response.text}")
+            app.logger.error(f"Error summarizing conversation history for {call_sid}: {response.status_code} {response.text}")
+            return
+
+        summary = orjson.loads(response.content)["choices"][0]["message"]["content"]
 
     except Exception as e:
-        print("Error calling LLM API:", str(e))  # Debugging output
-        app.logger.error("Error calling LLM API:", str(e)) 
-        for handler in app.logger.handlers:
-            if hasattr(handler, 'flush'):
-                handler.flush()
-        return "I'm sorry, I couldn't process your request."
-    
+        print("Error summarizing conversation history:", str(e))
+        app.logger.error(f"Error summarizing conversation history for {call_sid}: {e}")
+        return
+
+    summary_message = {"role": "system", "content": f"Summary: {summary}"}
+
+    with _lock:
+        history = conversation_history.get(call_sid)
+        if history is None:
+            return
+
+        if history and history[0]["role"] == "system":
+            history[0] = summary_message
+        else:
+            history.insert(0, summary_message)
+
 
 # For this project to work with the local LLM/MIE_LLM_function_calling example you can uncomment the below line and comment the previous query_llm declaration
-# def query_llm(user_input, call_sid):
+# async def query_llm(user_input, call_sid):
 
 #     url = "http://127.0.0.1:5000/chat"
 #     payload = {
@@ -255,16 +582,16 @@ def query_llm(conversation_history):
 #         "user_input": user_input
 #     }
 
-#     response = requests.post(url, json=payload)
+#     response = await _HTTP.post(url, json=payload)
 
 #     if response.status_code == 200:
 #         result = response.json()
-#         return result['response']
+#         return result['response'], MISS
 #     else:
 #         raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
 
 
-# Run Flask
+# Run Quart (use hypercorn for deployments: hypercorn twilio_stt_app:app --bind 127.0.0.1:5000 --workers 1 --worker-class asyncio)
 if __name__ == "__main__":
     # For this project to work with the local LLM/MIE_LLM_function_calling example maybe change the port
     app.run(port=5000, debug=True)